@@ -1,17 +1,24 @@
 import os
+import time
+import queue
 import smtplib
+import threading
+import traceback
+from collections import namedtuple
 import requests
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-import matplotlib.pyplot as plt
+import altair as alt
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 
 import streamlit as st
-from streamlit_autorefresh import st_autorefresh
 
-COINGECKO_SIMPLE_PRICE = (
-    "https://api.coingecko.com/api/v3/simple/price"
+COINGECKO_MARKETS = (
+    "https://api.coingecko.com/api/v3/coins/markets"
 )
 
 DEFAULT_COINS = [
@@ -26,27 +33,109 @@ DEFAULT_COINS = [
 SUPPORTED_FIAT = ["usd", "inr", "eur"]
 ALERT_LOG_FILE = "alerts.log"
 HISTORY_LEN = 300
+# Auto-refresh backs off while every coin moves less than this (relative)
+QUIET_REL_CHANGE = 1e-4
+QUIET_RUNS = 3
+MAX_REFRESH_SEC = 300
+PRICE_CACHE_TTL = 10
+SMTP_TIMEOUT = 30
 st.set_page_config(page_title="Crypto Price Tracker", layout="wide")
 
-@st.cache_data(ttl=10)
-def fetch_prices(coin_ids: list, vs_currency: str = "usd") -> dict:
-    """Fetch current price & 24h change using CoinGecko simple/price.
+
+@st.cache_resource
+def _session():
+    """Shared HTTP session so the TLS connection to CoinGecko stays warm.
+    Retries with backoff on rate limiting (429) and transient gateway errors;
+    Retry-After is ignored so a rate limit can't stall the caller for minutes.
+    """
+    s = requests.Session()
+    s.mount("https://", HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 502, 503],
+            respect_retry_after_header=False,
+        ),
+    ))
+    return s
+
+
+@st.cache_resource
+def _price_cache():
+    """Process-wide {(coins, currency): (timestamp, payload, error)} store, plus
+    one lock per key and a lock guarding both dicts. Failures are cached too
+    (payload None) so an outage isn't retried by every session on every tick.
+    Held in cache_resource so it survives reruns and is shared by all sessions.
+    """
+    return {}, {}, threading.Lock()
+
+
+def fetch_prices(coin_ids: tuple, vs_currency: str = "usd") -> tuple:
+    """Fetch price, 24h change & 7d sparkline using CoinGecko coins/markets.
+    Returns (fetched_at, {coin_id: market item}); fetched_at is None on failure
+    and stays the same while the cached payload is served.
     Cached for 10 seconds to be gentle on the API.
+    coin_ids should be a sorted, lower-cased tuple so equivalent selections share a cache entry.
     """
     if not coin_ids:
-        return {}
-    params = {
-        "ids": ",".join(coin_ids),
-        "vs_currencies": vs_currency,
-        "include_24hr_change": "true",
-    }
-    try:
-        r = requests.get(COINGECKO_SIMPLE_PRICE, params=params, timeout=20)
-        r.raise_for_status()
-        return r.json()
-    except Exception as e:
-        st.error(f"Failed to fetch prices: {e}")
-        return {}
+        return None, {}
+    key = (coin_ids, vs_currency)
+    cache, key_locks, lock = _price_cache()
+    with lock:
+        key_lock = key_locks.setdefault(key, threading.Lock())
+
+    # Concurrent callers for the same key wait for one request; other keys
+    # are never blocked by it
+    with key_lock:
+        with lock:
+            hit = cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < PRICE_CACHE_TTL:
+            fetched_at, payload, error = hit
+            if payload is None:
+                st.error(f"Failed to fetch prices: {error}")
+                return None, {}
+            return fetched_at, payload
+
+        params = {
+            "vs_currency": vs_currency,
+            "ids": ",".join(coin_ids),
+            "sparkline": "true",
+            "price_change_percentage": "24h",
+            "per_page": 250,
+        }
+        payload, error = None, None
+        try:
+            r = _session().get(COINGECKO_MARKETS, params=params, timeout=20)
+            r.raise_for_status()
+            payload = {item["id"]: item for item in r.json()}
+        except Exception as e:
+            error = e
+
+        with lock:
+            now = time.monotonic()
+            cache[key] = (now, payload, error)
+            # Drop expired entries so old coin selections don't pin their sparklines
+            for k in [k for k, (ts, _, _) in cache.items() if now - ts >= PRICE_CACHE_TTL]:
+                del cache[k]
+            # Keep locks that are held (a refetch is in flight) or still guard an entry
+            for k in [k for k, kl in key_locks.items() if k not in cache and not kl.locked()]:
+                del key_locks[k]
+
+    if payload is None:
+        st.error(f"Failed to fetch prices: {error}")
+        return None, {}
+    return now, payload
+
+
+def build_email(subject: str, body: str, sender: str, receiver: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["To"] = receiver
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    return msg
 
 
 def send_email_alert(subject: str, body: str,
@@ -55,22 +144,118 @@ def send_email_alert(subject: str, body: str,
                      sender: str,
                      password: str,
                      receiver: str):
-    msg = MIMEMultipart()
-    msg["From"] = sender
-    msg["To"] = receiver
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain"))
+    msg = build_email(subject, body, sender, receiver)
 
-    with smtplib.SMTP_SSL(smtp_server, int(smtp_port)) as server:
+    with smtplib.SMTP_SSL(smtp_server, int(smtp_port), timeout=SMTP_TIMEOUT) as server:
         server.login(sender, password)
         server.sendmail(sender, receiver, msg.as_string())
 
 
+@st.cache_resource
+def _log_fh():
+    """Holder for the shared append handle; line-buffered so each alert reaches
+    the file as soon as it is written. log_alert reopens it after rotation.
+    """
+    return {"fh": None}, threading.Lock()
+
+
 def log_alert(message: str):
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     line = f"[{ts}] {message}\n"
-    with open(ALERT_LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(line)
+    holder, lock = _log_fh()
+    with lock:
+        fh = holder["fh"]
+        try:
+            current_ino = os.stat(ALERT_LOG_FILE).st_ino
+        except FileNotFoundError:
+            current_ino = None
+        # Reopen if the log was deleted or rotated, else we'd write to a dead inode
+        if fh is None or current_ino != os.fstat(fh.fileno()).st_ino:
+            if fh is not None:
+                fh.close()
+            fh = holder["fh"] = open(ALERT_LOG_FILE, "a", encoding="utf-8", buffering=1)
+        fh.write(line)
+
+
+@st.cache_data(ttl=5)
+def tail_log(path: str, mtime: float, n: int = 50, block: int = 8192) -> str:
+    """Return the last n lines of the log by reading only its final block.
+    mtime is part of the cache key so an unchanged file skips the read.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        start = max(0, end - block)
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8", "replace")
+    lines = data.splitlines()
+    if start > 0:
+        # First line is probably cut off mid-way
+        lines = lines[1:]
+    return "\n".join(lines[-n:])
+
+
+def _mail_worker(q: queue.Queue):
+    """Drain queued alerts, keeping one authenticated SMTP_SSL connection open.
+    Reconnects when the server drops us or the SMTP settings change.
+    """
+    server = None
+    server_creds = None
+    while True:
+        subject, body, creds = q.get()
+        # Never let one bad message (or a failed log write) kill the only sender
+        try:
+            smtp_server, smtp_port, sender, password, receiver = creds
+            msg = build_email(subject, body, sender, receiver)
+            for attempt in range(2):
+                try:
+                    if server is None or server_creds != creds:
+                        if server is not None:
+                            try:
+                                server.quit()
+                            except Exception:
+                                pass
+                        server = smtplib.SMTP_SSL(smtp_server, int(smtp_port), timeout=SMTP_TIMEOUT)
+                        server.login(sender, password)
+                        server_creds = creds
+                    server.send_message(msg)
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    server = None
+                    if attempt:
+                        log_alert(f"Email failed for '{subject}': server disconnected")
+                except Exception as e:
+                    if server is not None:
+                        try:
+                            server.close()
+                        except Exception:
+                            pass
+                    server = None
+                    log_alert(f"Email failed for '{subject}': {e}")
+                    break
+        except Exception:
+            traceback.print_exc()
+        finally:
+            q.task_done()
+
+
+@st.cache_resource
+def _mail_queue() -> queue.Queue:
+    """Bounded alert-email queue served by a single daemon sender thread."""
+    q = queue.Queue(maxsize=1000)
+    threading.Thread(target=_mail_worker, args=(q,), daemon=True).start()
+    return q
+
+
+def add_custom_coin():
+    """Text-input callback: add the typed ID to the coin picker and select it."""
+    coin = st.session_state.custom_coin.strip().lower()
+    if coin:
+        if coin not in st.session_state.coin_options:
+            st.session_state.coin_options.append(coin)
+        if coin not in st.session_state.selected_coins:
+            st.session_state.selected_coins = st.session_state.selected_coins + [coin]
+    st.session_state.custom_coin = ""
 
 
 def get_env_or_default(key: str, default: str = "") -> str:
@@ -78,21 +263,50 @@ def get_env_or_default(key: str, default: str = "") -> str:
     return val if val is not None else default
 
 
+# One coin's fetched quote; price/change are None when CoinGecko omitted them
+Snap = namedtuple("Snap", "coin price change")
+
+
+class Ring:
+    """Fixed-size float32 price history; push overwrites the oldest point."""
+    __slots__ = ("buf", "n", "i")
+
+    def __init__(self):
+        self.buf = np.zeros(HISTORY_LEN, dtype=np.float32)
+        self.n = 0
+        self.i = 0
+
+    def __len__(self):
+        return self.n
+
+    def push(self, v: float):
+        self.buf[self.i % HISTORY_LEN] = v
+        self.i += 1
+        self.n = min(self.n + 1, HISTORY_LEN)
+
+    def values(self) -> np.ndarray:
+        """Points in chronological order (oldest first)."""
+        if self.n < HISTORY_LEN:
+            return self.buf[:self.n]
+        return np.roll(self.buf, -(self.i % HISTORY_LEN))
+
+
 with st.sidebar:
     st.title("⚙️ Settings")
 
-    coins = st.multiselect(
+    # Custom IDs join the options so they can be deselected like built-in coins
+    st.session_state.setdefault("coin_options", list(DEFAULT_COINS))
+    st.session_state.setdefault("selected_coins", ["bitcoin", "ethereum", "dogecoin"])
+    selected_coins = st.multiselect(
         "Select coins (CoinGecko IDs)",
-        options=DEFAULT_COINS,
-        default=["bitcoin", "ethereum", "dogecoin"],
-        help="Use CoinGecko coin IDs. You can type to add other valid IDs."
+        options=st.session_state.coin_options,
+        key="selected_coins",
+        help="Use CoinGecko coin IDs. Add other valid IDs below."
     )
     # Allow adding custom coin IDs
-    custom_coin = st.text_input("Add custom coin ID (press Enter)")
-    if custom_coin:
-        if custom_coin not in coins:
-            coins.append(custom_coin.lower())
-        st.experimental_rerun()
+    st.text_input("Add custom coin ID (press Enter)", key="custom_coin", on_change=add_custom_coin)
+    # Normalise once so table, history, thresholds and the fetch all agree on IDs
+    coins = list(dict.fromkeys(c.strip().lower() for c in selected_coins))
 
     vs_currency = st.selectbox("Currency", SUPPORTED_FIAT, index=0)
 
@@ -140,177 +354,258 @@ with st.sidebar:
 
 # -------------------- Main Layout --------------------
 st.title("🪙 Crypto Price Tracker")
-colA, colB = st.columns([3, 2])
 
 if "history" not in st.session_state:
+    # {coin: Ring}
     st.session_state.history = {}
 if "last_alert_state" not in st.session_state:
-    # Track last condition to avoid repeat spamming: {coin: {"above": bool, "below": bool}}
-    st.session_state.last_alert_state = {}
+    # Track last condition to avoid repeat spamming: coin -> below | above (bool)
+    st.session_state.last_alert_state = pd.DataFrame(columns=["below", "above"], dtype=bool)
 
 # Editable thresholds table
 st.subheader("🎯 Alert Thresholds")
-if "thresholds" not in st.session_state:
-    # DataFrame: coin | lower | upper
-    df_init = pd.DataFrame({
-        "coin": coins if coins else [],
-        "lower": [None] * len(coins),
-        "upper": [None] * len(coins),
-    })
-    st.session_state.thresholds = df_init
-else:
-    # Ensure new coins appear in the table
-    existing = set(st.session_state.thresholds["coin"].tolist())
-    for c in coins:
-        if c not in existing:
-            st.session_state.thresholds = pd.concat([
-                st.session_state.thresholds,
-                pd.DataFrame({"coin": [c], "lower": [None], "upper": [None]})
-            ], ignore_index=True)
+if "thresholds_map" not in st.session_state:
+    # {coin: {"lower": float | None, "upper": float | None}}
+    st.session_state.thresholds_map = {}
+thresholds_map = st.session_state.thresholds_map
+# Ensure new coins appear in the table
+for c in coins:
+    thresholds_map.setdefault(c, {"lower": None, "upper": None})
 
+thresholds_df = pd.DataFrame.from_dict(
+    thresholds_map, orient="index", columns=["lower", "upper"]
+).reset_index(names="coin")
 editable_df = st.data_editor(
-    st.session_state.thresholds,
+    thresholds_df,
     num_rows="dynamic",
     use_container_width=True,
     hide_index=True,
 )
+# Cast once so the alert loop compares plain floats (blank cells -> NaN)
+editable_df["lower"] = pd.to_numeric(editable_df["lower"], errors="coerce")
+editable_df["upper"] = pd.to_numeric(editable_df["upper"], errors="coerce")
 # Persist the edited thresholds
-st.session_state.thresholds = editable_df
+thresholds_map = {
+    r.coin: {"lower": r.lower, "upper": r.upper}
+    for r in editable_df.itertuples(index=False)
+    if r.coin
+}
+st.session_state.thresholds_map = thresholds_map
 
 st.divider()
 
-# Fetch prices
-price_data = fetch_prices(coins, vs_currency=vs_currency)
-
-# Build a display table
-rows = []
-now = datetime.now()
-for c in coins:
-    d = price_data.get(c, {})
-    price = d.get(vs_currency)
-    change_24h = d.get(f"{vs_currency}_24h_change")
-
-    # Update in-session history for trend lines
-    hist = st.session_state.history.get(c, [])
-    if price is not None:
-        hist.append(price)
-        if len(hist) > HISTORY_LEN:
-            hist = hist[-HISTORY_LEN:]
-        st.session_state.history[c] = hist
-
-    rows.append({
-        "coin": c,
-        f"price ({vs_currency})": price,
-        "24h change %": round(change_24h, 3) if change_24h is not None else None,
-        "updated": now.strftime("%H:%M:%S"),
-    })
-
-prices_df = pd.DataFrame(rows)
-
-# Display current prices
-with colA:
-    st.subheader("📊 Live Prices")
-    st.dataframe(prices_df, use_container_width=True)
-
-# Charts
-with colB:
-    st.subheader("📈 Trends (session)")
-    if not coins:
-        st.info("Select at least one coin in the sidebar.")
+# -------------------- Live Panel --------------------
+# Only this fragment reruns on the refresh timer; the sidebar and the
+# thresholds editor are rebuilt only when the user interacts with them.
+if all([smtp_server, smtp_port, email_sender, email_password, email_receiver]):
+    email_creds = (smtp_server, int(smtp_port), email_sender, email_password, email_receiver)
+else:
+    email_creds = None
+if st.session_state.get("base_interval") != refresh_sec:
+    # Slider moved (or first run): restart the backoff from the new interval
+    st.session_state.base_interval = refresh_sec
+    st.session_state.effective_interval = refresh_sec
+    st.session_state.quiet_runs = 0
+
+
+@st.fragment(run_every=f"{refresh_sec}s")
+def live_panel(coins: list, vs_currency: str, thresholds_map: dict,
+               refresh_sec: int, email_creds):
+    # Fetch prices. The fragment ticks every refresh_sec, but while backed off
+    # it only fetches once effective_interval has passed (or the selection
+    # changed) and otherwise redraws the last payload.
+    coins_key = tuple(sorted(coins))
+    fetch_key = (coins_key, vs_currency)
+    last_fetch = st.session_state.get("last_fetch")
+    due = (
+        last_fetch is None
+        or last_fetch[1] != fetch_key
+        # Half a tick of slack so timer jitter doesn't skip a whole period
+        or time.monotonic() - last_fetch[0] + refresh_sec / 2 >= st.session_state.effective_interval
+    )
+    if due:
+        fetched_at, price_data = fetch_prices(coins_key, vs_currency=vs_currency)
+        if fetched_at is not None:
+            st.session_state.last_fetch = (time.monotonic(), fetch_key, fetched_at, price_data)
     else:
-        # Draw a small line chart per coin using matplotlib
-        for c in coins:
-            hist = st.session_state.history.get(c, [])
-            if len(hist) < 2:
-                continue
-            fig, ax = plt.subplots()
-            ax.plot(hist)
-            ax.set_title(f"{c} — last {len(hist)} pts")
-            ax.set_xlabel("Time steps")
-            ax.set_ylabel(f"Price ({vs_currency.upper()})")
-            st.pyplot(fig)
-
-# -------------------- Alert Logic --------------------
-triggered_alerts = []
-
-# Merge thresholds into lookup
-th_map = {row["coin"]: row for _, row in st.session_state.thresholds.iterrows()}
-
-for c in coins:
-    d = price_data.get(c, {})
-    price = d.get(vs_currency)
-    if price is None:
-        continue
-
-    th = th_map.get(c)
-    if th is None:
-        continue
-
-    lower = th.get("lower")
-    upper = th.get("upper")
-
-    # Prepare last state
-    last_state = st.session_state.last_alert_state.get(c, {"above": False, "below": False})
-
-    crossed_below = (lower is not None) and (price <= float(lower))
-    crossed_above = (upper is not None) and (price >= float(upper))
-
-    # Trigger only on edge crossing (not continuous)
-    if crossed_below and not last_state.get("below", False):
-        msg = f"{c} at {price} {vs_currency.upper()} is <= lower threshold {lower}"
-        triggered_alerts.append((c, msg))
-        last_state["below"] = True
-    elif not crossed_below:
-        last_state["below"] = False
-
-    if crossed_above and not last_state.get("above", False):
-        msg = f"{c} at {price} {vs_currency.upper()} is >= upper threshold {upper}"
-        triggered_alerts.append((c, msg))
-        last_state["above"] = True
-    elif not crossed_above:
-        last_state["above"] = False
-
-    st.session_state.last_alert_state[c] = last_state
-
-# Display & act on alerts
-if triggered_alerts:
-    st.warning("\n".join([m for _, m in triggered_alerts]))
-
-    # Log to file + send email(s)
-    for c, message in triggered_alerts:
-        log_alert(message)
-        # Email if configured
-        if all([smtp_server, smtp_port, email_sender, email_password, email_receiver]):
-            try:
-                send_email_alert(
-                    subject=f"Crypto Alert: {c}",
-                    body=message,
-                    smtp_server=smtp_server,
-                    smtp_port=int(smtp_port),
-                    sender=email_sender,
-                    password=email_password,
-                    receiver=email_receiver,
-                )
-                st.toast(f"Email sent for {c}")
-            except Exception as e:
-                st.error(f"Email failed for {c}: {e}")
+        _, _, fetched_at, price_data = last_fetch
+    # Only a new payload adds trend points; cache hits would repeat the last price
+    fresh = fetched_at is not None and fetched_at != st.session_state.get("last_fetched_at")
+    if fresh:
+        st.session_state.last_fetched_at = fetched_at
+
+    # Build a display table
+    rows = []
+    now = datetime.now()
+    updated = now.strftime("%H:%M:%S")
+    price_col = f"price ({vs_currency})"
+    # Single pass over the response; reused by the table, alerts and auto-refresh
+    snaps = [
+        Snap(c, (d := price_data.get(c) or {}).get("current_price"), d.get("price_change_percentage_24h"))
+        for c in coins
+    ]
+    for snap in snaps:
+        # Update in-session history for trend lines
+        if snap.price is not None:
+            hist = st.session_state.history.get(snap.coin)
+            if hist is None:
+                # Seed new coins from the 7d sparkline so the chart isn't empty
+                hist = st.session_state.history[snap.coin] = Ring()
+                sparkline = (price_data[snap.coin].get("sparkline_in_7d") or {}).get("price") or []
+                for v in sparkline[-(HISTORY_LEN - 1):]:
+                    if v is not None:
+                        hist.push(v)
+                hist.push(snap.price)
+            elif fresh:
+                hist.push(snap.price)
+
+        rows.append({
+            "coin": snap.coin,
+            price_col: snap.price,
+            "24h change %": round(snap.change, 3) if snap.change is not None else None,
+            "updated": updated,
+        })
+
+    prices_df = pd.DataFrame(rows)
+
+    # Display current prices
+    colA, colB = st.columns([3, 2])
+    with colA:
+        st.subheader("📊 Live Prices")
+        st.dataframe(prices_df, use_container_width=True)
+
+    # Charts
+    with colB:
+        st.subheader("📈 Trends (session)")
+        if not coins:
+            st.info("Select at least one coin in the sidebar.")
         else:
-            st.info("Email not sent (missing SMTP configuration).")
-
-# -------------------- Alert Log Viewer --------------------
-st.divider()
-st.subheader("📝 Alert Log (latest 50 lines)")
-if os.path.exists(ALERT_LOG_FILE):
-    try:
-        with open(ALERT_LOG_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        tail = lines[-50:]
-        st.code("".join(tail) if tail else "<empty>")
-    except Exception as e:
-        st.error(f"Failed to read log: {e}")
-else:
-    st.caption("No alerts logged yet.")
+            # One chart spec over a long coin | t | price frame, one row per coin.
+            # t counts back from each coin's latest point (t = 0) so rows line up
+            # even when a coin was added later or seeded from a sparkline.
+            # Ring.i counts every push and pushes only happen for a fresh payload,
+            # so an unchanged signature means no new points
+            # and the frame from the previous run can be reused as-is.
+            hist_sig = tuple(
+                (c, st.session_state.history[c].i if c in st.session_state.history else 0)
+                for c in coins
+            )
+            cached = st.session_state.get("hist_chart")
+            if cached is not None and cached[0] == hist_sig:
+                hist_df = cached[1]
+            else:
+                history = st.session_state.history
+                hist_df = pd.DataFrame(
+                    [(c, i - len(history[c]) + 1, v) for c in coins if c in history
+                     for i, v in enumerate(history[c].values().tolist())],
+                    columns=["coin", "t", "price"],
+                )
+                st.session_state.hist_chart = (hist_sig, hist_df)
+            if hist_df.empty or hist_df["t"].min() > -1:
+                st.caption("Collecting data points...")
+            else:
+                # Independent y scales: BTC, ETH and DOGE differ by orders of magnitude
+                chart = alt.Chart(hist_df).mark_line().encode(
+                    x=alt.X("t:Q", title="Time steps (0 = latest)"),
+                    y=alt.Y("price:Q", title=f"Price ({vs_currency.upper()})", scale=alt.Scale(zero=False)),
+                    color=alt.Color("coin:N", legend=None),
+                ).properties(height=120).facet(
+                    row=alt.Row("coin:N", title=None),
+                ).resolve_scale(y="independent")
+                st.altair_chart(chart, use_container_width=True)
+
+    # Alert logic
+    triggered_alerts = []
+
+    prices = [snap.price for snap in snaps]
+    merged = pd.DataFrame({"price": prices}, index=coins, dtype="float64").join(
+        pd.DataFrame.from_dict(thresholds_map, orient="index", columns=["lower", "upper"])
+    ).astype("float64")
+
+    prev = st.session_state.last_alert_state.reindex(coins, fill_value=False)
+    prev_below = prev["below"].to_numpy(dtype=bool)
+    prev_above = prev["above"].to_numpy(dtype=bool)
+
+    # NaN thresholds/prices compare as False; keep the old state while a price is missing
+    has_price = merged["price"].notna().to_numpy()
+    new_below = np.where(has_price, merged["price"].le(merged["lower"]).to_numpy(), prev_below)
+    new_above = np.where(has_price, merged["price"].ge(merged["upper"]).to_numpy(), prev_above)
 
-# -------------------- Auto Refresh --------------------
-# Refresh every N seconds (user sets from sidebar)
-st_autorefresh(interval=refresh_sec * 1000, key="crypto-refresh")
+    # Trigger only on edge crossing (not continuous)
+    fire_below = new_below & ~prev_below
+    fire_above = new_above & ~prev_above
+    for i in np.flatnonzero(fire_below | fire_above):
+        c, price = coins[i], prices[i]
+        if fire_below[i]:
+            lower = merged["lower"].iat[i]
+            msg = f"{c} at {price} {vs_currency.upper()} is <= lower threshold {lower}"
+            triggered_alerts.append((c, msg))
+        if fire_above[i]:
+            upper = merged["upper"].iat[i]
+            msg = f"{c} at {price} {vs_currency.upper()} is >= upper threshold {upper}"
+            triggered_alerts.append((c, msg))
+
+    # Overwrite only the selected rows; deselected coins keep their edge state
+    # so reselecting a coin already past its threshold doesn't alert again
+    st.session_state.last_alert_state = pd.concat([
+        st.session_state.last_alert_state.drop(index=coins, errors="ignore"),
+        pd.DataFrame({"below": new_below, "above": new_above}, index=coins),
+    ])
+
+    # Display & act on alerts
+    if triggered_alerts:
+        st.warning("\n".join([m for _, m in triggered_alerts]))
+
+        # Log to file + send email(s)
+        for c, message in triggered_alerts:
+            log_alert(message)
+            # Email if configured
+            if email_creds is not None:
+                try:
+                    _mail_queue().put_nowait((f"Crypto Alert: {c}", message, email_creds))
+                    st.toast(f"Email queued for {c}")
+                except queue.Full:
+                    st.error(f"Email failed for {c}: send queue is full")
+            else:
+                st.info("Email not sent (missing SMTP configuration).")
+
+    # Alert log viewer
+    st.divider()
+    st.subheader("📝 Alert Log (latest 50 lines)")
+    if os.path.exists(ALERT_LOG_FILE):
+        try:
+            tail = tail_log(ALERT_LOG_FILE, os.path.getmtime(ALERT_LOG_FILE))
+            st.code(tail if tail else "<empty>")
+        except Exception as e:
+            st.error(f"Failed to read log: {e}")
+    else:
+        st.caption("No alerts logged yet.")
+
+    # Auto refresh: every N seconds (user sets from sidebar), doubling the interval
+    # after QUIET_RUNS flat refreshes and snapping back on any move or alert.
+    # Only fresh payloads count; cache hits say nothing about the market.
+    moved = False
+    if fresh:
+        prev_prices = st.session_state.get("last_prices", {})
+        cur_prices = {snap.coin: snap.price for snap in snaps}
+        max_rel = max(
+            (abs(p - prev_prices[c]) / prev_prices[c]
+             for c, p in cur_prices.items() if p is not None and prev_prices.get(c)),
+            default=None,
+        )
+        st.session_state.last_prices = cur_prices
+        moved = max_rel is None or max_rel >= QUIET_REL_CHANGE
+
+    if triggered_alerts or moved:
+        st.session_state.quiet_runs = 0
+        st.session_state.effective_interval = refresh_sec
+    elif fresh:
+        st.session_state.quiet_runs += 1
+        if st.session_state.quiet_runs >= QUIET_RUNS:
+            st.session_state.effective_interval = min(
+                st.session_state.effective_interval * 2, max(MAX_REFRESH_SEC, refresh_sec)
+            )
+            st.session_state.quiet_runs = 0
+
+
+live_panel(coins, vs_currency, thresholds_map, refresh_sec, email_creds)